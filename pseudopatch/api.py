@@ -1,72 +1,168 @@
 from __future__ import annotations
 
+import functools
+import os
 import pathlib
-from typing import Callable, Dict, List, Tuple
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterator, List, Tuple
 
 from .domain import Commit, Patch, ActionType
 from .exceptions import DiffError
-from .patching import Parser, patch_to_commit
+from .patching import (
+    _ADD_FILE,
+    _BEGIN_PATCH,
+    _DELETE_FILE,
+    _END_PATCH,
+    _UPDATE_FILE,
+    Parser,
+    _action_to_change,
+)
 
 
-def text_to_patch(text: str, orig: Dict[str, str]) -> Tuple[Patch, int]:
+def _make_parser(text: str, orig: Dict[str, str]) -> Parser:
     lines = text.splitlines()
     if (
         len(lines) < 2
-        or not Parser._norm(lines[0]).startswith("*** Begin Patch")
-        or Parser._norm(lines[-1]) != "*** End Patch"
+        or not Parser._norm(lines[0]).startswith(_BEGIN_PATCH)
+        or Parser._norm(lines[-1]) != _END_PATCH
     ):
         raise DiffError("Invalid patch text - missing sentinels")
+    return Parser(current_files=orig, lines=lines, index=1)
+
 
-    parser = Parser(current_files=orig, lines=lines, index=1)
+def text_to_patch(text: str, orig: Dict[str, str]) -> Tuple[Patch, int]:
+    parser = _make_parser(text, orig)
     parser.parse()
     return parser.patch, parser.fuzz
 
 
+# Characters that str.splitlines() treats as line boundaries
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+
+def _directive_lines(text: str) -> Iterator[str]:
+    """Yield the lines of text starting with "*** ", without splitting the rest."""
+    pos = text.find("*** ")
+    while pos != -1:
+        if pos == 0 or text[pos - 1] in _LINE_BREAKS:
+            end = text.find("\n", pos)
+            yield (text[pos:] if end == -1 else text[pos:end]).splitlines()[0]
+        pos = text.find("*** ", pos + 4)
+
+
+def _scan_sentinels(text: str) -> Tuple[List[str], List[str]]:
+    """Collect the (needed, added) file paths named in a patch in one pass."""
+    updated: List[str] = []
+    deleted: List[str] = []
+    added: List[str] = []
+    for line in _directive_lines(text):
+        if line.startswith(_UPDATE_FILE):
+            updated.append(line[len(_UPDATE_FILE):])
+        elif line.startswith(_DELETE_FILE):
+            deleted.append(line[len(_DELETE_FILE):])
+        elif line.startswith(_ADD_FILE):
+            added.append(line[len(_ADD_FILE):])
+    return updated + deleted, added
+
+
 def identify_files_needed(text: str) -> List[str]:
-    lines = text.splitlines()
-    return [
-        line[len("*** Update File: "):]
-        for line in lines
-        if line.startswith("*** Update File: ")
-    ] + [
-        line[len("*** Delete File: "):]
-        for line in lines
-        if line.startswith("*** Delete File: ")
-    ]
+    return _scan_sentinels(text)[0]
 
 
 def identify_files_added(text: str) -> List[str]:
-    lines = text.splitlines()
-    return [
-        line[len("*** Add File: "):]
-        for line in lines
-        if line.startswith("*** Add File: ")
-    ]
+    return _scan_sentinels(text)[1]
+
+
+def load_files(
+    paths: List[str], open_fn: Callable[[str], str], parallel: bool = True
+) -> Dict[str, str]:
+    if not parallel or len(paths) < 2:
+        return {path: open_fn(path) for path in paths}
+    # Reads are I/O bound and release the GIL, so overlap them on a thread pool
+    with ThreadPoolExecutor(max_workers=min(32, len(paths))) as executor:
+        contents = list(executor.map(open_fn, paths))
+    return dict(zip(paths, contents))
+
 
+def _run_concurrently(ops: List[Callable[[], None]]) -> None:
+    """Run ops on a thread pool and raise the first failure in submission order.
 
-def load_files(paths: List[str], open_fn: Callable[[str], str]) -> Dict[str, str]:
-    return {path: open_fn(path) for path in paths}
+    After a failure, ops that have not started are cancelled; ops already
+    running are left to finish.
+    """
+    if not ops:
+        return
+    with ThreadPoolExecutor(max_workers=min(8, len(ops))) as executor:
+        futures = [executor.submit(op) for op in ops]
+        _done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+    for future in futures:
+        if not future.cancelled():
+            future.result()
+
+
+def _paths_independent(paths: List[str]) -> bool:
+    """True if no path repeats or lies inside another (e.g. "d" and "d/f")."""
+    normalized = [os.path.normcase(os.path.normpath(path)) for path in paths]
+    seen = set(normalized)
+    if len(seen) != len(normalized):
+        return False
+    for path in normalized:
+        parent = os.path.dirname(path)
+        while parent:
+            if parent in seen:
+                return False
+            grandparent = os.path.dirname(parent)
+            if grandparent == parent:
+                break
+            parent = grandparent
+    return True
 
 
 def apply_commit(
     commit: Commit,
     write_fn: Callable[[str, str], None],
     remove_fn: Callable[[str], None],
+    parallel: bool = False,
 ) -> None:
+    # (is_removal, operation) pairs, in commit order
+    ops: List[Tuple[bool, Callable[[], None]]] = []
+    touched: List[str] = []
     for path, change in commit.changes.items():
         if change.type is ActionType.DELETE:
-            remove_fn(path)
+            ops.append((True, functools.partial(remove_fn, path)))
+            touched.append(path)
         elif change.type is ActionType.ADD:
             if change.new_content is None:
                 raise DiffError(f"ADD change for {path} has no content")
-            write_fn(path, change.new_content)
+            ops.append((False, functools.partial(write_fn, path, change.new_content)))
+            touched.append(path)
         elif change.type is ActionType.UPDATE:
             if change.new_content is None:
                 raise DiffError(f"UPDATE change for {path} has no new content")
             target = change.move_path or path
-            write_fn(target, change.new_content)
+            ops.append(
+                (False, functools.partial(write_fn, target, change.new_content))
+            )
+            touched.append(target)
             if change.move_path:
-                remove_fn(path)
+                ops.append((True, functools.partial(remove_fn, path)))
+                touched.append(path)
+
+    # Operations on unrelated paths are independent and may overlap; if a
+    # path repeats (chained renames) or contains another (deleting "d/foo"
+    # then adding "d/foo/bar.txt"), keep the commit order.
+    if not parallel or len(ops) < 2 or not _paths_independent(touched):
+        for _is_removal, op in ops:
+            op()
+        return
+
+    # Removals only start once every write has succeeded, so a failed write
+    # never loses a moved file's source or a file due for deletion. If a
+    # removal fails, the writes and any other removals may already be applied.
+    _run_concurrently([op for is_removal, op in ops if not is_removal])
+    _run_concurrently([op for is_removal, op in ops if is_removal])
 
 
 def process_patch(
@@ -75,11 +171,15 @@ def process_patch(
     write_fn: Callable[[str, str], None],
     remove_fn: Callable[[str], None],
 ) -> str:
-    if not text.startswith("*** Begin Patch"):
-        raise DiffError("Patch text must start with *** Begin Patch")
+    if not text.startswith(_BEGIN_PATCH):
+        raise DiffError(f"Patch text must start with {_BEGIN_PATCH}")
     paths = identify_files_needed(text)
     orig = load_files(paths, open_fn)
-    patch, _fuzz = text_to_patch(text, orig)
-    commit = patch_to_commit(patch, orig)
+    # Stage each action as soon as it is parsed instead of building a Patch
+    # first; text_to_patch() remains for callers that want the Patch itself.
+    parser = _make_parser(text, orig)
+    commit = Commit()
+    for path, action, file_lines in parser.iter_actions():
+        commit.changes[path] = _action_to_change(path, action, orig, file_lines)
     apply_commit(commit, write_fn, remove_fn)
     return "Done!"
@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Dict, List, Optional
 
 
+# dataclass(slots=True) needs Python 3.10+; older versions keep a __dict__
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
 class ActionType(str, Enum):
     ADD = "add"
     DELETE = "delete"
     UPDATE = "update"
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class FileChange:
     type: ActionType
     old_content: Optional[str] = None
@@ -19,26 +24,33 @@ class FileChange:
     move_path: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Commit:
     changes: Dict[str, FileChange] = field(default_factory=dict)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class Chunk:
     orig_index: int = -1
     del_lines: List[str] = field(default_factory=list)
     ins_lines: List[str] = field(default_factory=list)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class PatchAction:
     type: ActionType
     new_file: Optional[str] = None
     chunks: List[Chunk] = field(default_factory=list)
     move_path: Optional[str] = None
 
+    def add_chunk(
+        self, orig_index: int, del_lines: List[str], ins_lines: List[str]
+    ) -> Chunk:
+        chunk = Chunk(orig_index=orig_index, del_lines=del_lines, ins_lines=ins_lines)
+        self.chunks.append(chunk)
+        return chunk
+
 
-@dataclass
+@dataclass(**_SLOTS)
 class Patch:
     actions: Dict[str, PatchAction] = field(default_factory=dict)
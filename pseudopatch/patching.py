@@ -1,11 +1,39 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from dataclasses import dataclass, field
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from .domain import ActionType, Chunk, Commit, FileChange, Patch, PatchAction
 from .exceptions import DiffError
 
+_BEGIN_PATCH = "*** Begin Patch"
+_END_PATCH = "*** End Patch"
+_UPDATE_FILE = "*** Update File: "
+_DELETE_FILE = "*** Delete File: "
+_ADD_FILE = "*** Add File: "
+_MOVE_TO = "*** Move to: "
+_END_OF_FILE = "*** End of File"
+
+# Directives that open a file action, and the kind of action each one starts
+_FILE_SENTINELS = {
+    _UPDATE_FILE: ActionType.UPDATE,
+    _DELETE_FILE: ActionType.DELETE,
+    _ADD_FILE: ActionType.ADD,
+}
+# The directives differ at their fifth character ("*** U...", "*** D...", ...)
+_SENTINEL_BY_INITIAL = {prefix[4]: prefix for prefix in _FILE_SENTINELS}
+
+# Lines that end the body of an Add File / Update File section
+_FILE_BOUNDARIES = (
+    _END_PATCH,
+    "*** Update File:",
+    "*** Delete File:",
+    "*** Add File:",
+)
+_SECTION_BOUNDARIES = _FILE_BOUNDARIES + (_END_OF_FILE,)
+_CHUNK_BOUNDARIES = ("@@",) + _SECTION_BOUNDARIES
+
 
 @dataclass
 class Parser:
@@ -49,57 +77,60 @@ class Parser:
         return line
 
     def parse(self) -> None:
-        while not self.is_done(("*** End Patch",)):
-            path = self.read_str("*** Update File: ")
-            if path:
-                if path in self.patch.actions:
-                    raise DiffError(f"Duplicate update for file: {path}")
-                move_to = self.read_str("*** Move to: ")
+        for path, action, _file_lines in self.iter_actions():
+            self.patch.actions[path] = action
+
+    def iter_actions(
+        self,
+    ) -> Iterator[Tuple[str, PatchAction, Optional[List[str]]]]:
+        """Yield each file action as soon as it is parsed.
+
+        Updates also carry the split lines of the file they were parsed
+        against (None for other actions), so they can be applied without
+        splitting the file again.
+        """
+        seen: Set[str] = set()
+        while not self.is_done((_END_PATCH,)):
+            line = self._cur_line()
+            norm = self._norm(line)
+            prefix = _SENTINEL_BY_INITIAL.get(norm[4:5], "")
+            path = line[len(prefix):] if prefix and norm.startswith(prefix) else ""
+            if not path:
+                raise DiffError(f"Unknown line while parsing: {line}")
+            self.index += 1
+
+            kind = _FILE_SENTINELS[prefix]
+            if path in seen:
+                raise DiffError(f"Duplicate {kind.value} for file: {path}")
+            seen.add(path)
+
+            file_lines: Optional[List[str]] = None
+            if kind is ActionType.UPDATE:
+                move_to = self.read_str(_MOVE_TO)
                 if path not in self.current_files:
                     raise DiffError(f"Update File Error - missing file: {path}")
-                text = self.current_files[path]
-                action = self._parse_update_file(text)
+                file_lines = self.current_files[path].split("\n")
+                action = self._parse_update_file(file_lines)
                 action.move_path = move_to or None
-                self.patch.actions[path] = action
-                continue
-
-            path = self.read_str("*** Delete File: ")
-            if path:
-                if path in self.patch.actions:
-                    raise DiffError(f"Duplicate delete for file: {path}")
+            elif kind is ActionType.DELETE:
                 if path not in self.current_files:
                     raise DiffError(f"Delete File Error - missing file: {path}")
-                self.patch.actions[path] = PatchAction(type=ActionType.DELETE)
-                continue
-
-            path = self.read_str("*** Add File: ")
-            if path:
-                if path in self.patch.actions:
-                    raise DiffError(f"Duplicate add for file: {path}")
+                action = PatchAction(type=ActionType.DELETE)
+            else:
                 if path in self.current_files:
                     raise DiffError(f"Add File Error - file already exists: {path}")
-                self.patch.actions[path] = self._parse_add_file()
-                continue
-
-            raise DiffError(f"Unknown line while parsing: {self._cur_line()}")
+                action = self._parse_add_file()
+            yield path, action, file_lines
 
-        if not self.startswith("*** End Patch"):
+        if not self.startswith(_END_PATCH):
             raise DiffError("Missing *** End Patch sentinel")
         self.index += 1
 
-    def _parse_update_file(self, text: str) -> PatchAction:
+    def _parse_update_file(self, lines: List[str]) -> PatchAction:
         action = PatchAction(type=ActionType.UPDATE)
-        lines = text.split("\n")
+        line_index = _LineIndex(lines)
         index = 0
-        while not self.is_done(
-            (
-                "*** End Patch",
-                "*** Update File:",
-                "*** Delete File:",
-                "*** Add File:",
-                "*** End of File",
-            )
-        ):
+        while not self.is_done(_SECTION_BOUNDARIES):
             def_str = self.read_str("@@ ")
             section_str = ""
             if not def_str and self._norm(self._cur_line()) == "@@":
@@ -116,20 +147,19 @@ class Parser:
                             index = i + 1
                             found = True
                             break
-                if not found and def_str.strip() not in [
-                    s.strip() for s in lines[:index]
-                ]:
-                    for i, s in enumerate(lines[index:], index):
-                        if s.strip() == def_str.strip():
-                            index = i + 1
-                            self.fuzz += 1
-                            found = True
-                            break
+                if not found:
+                    # First whitespace-insensitive occurrence, unless it lies
+                    # before the current position
+                    hit = line_index.first(str.strip, def_str.strip())
+                    if hit >= index:
+                        index = hit + 1
+                        self.fuzz += 1
+                        found = True
 
             next_ctx, chunks, end_idx, eof = peek_next_section(
                 self.lines, self.index
             )
-            new_index, fuzz = find_context(lines, next_ctx, index, eof)
+            new_index, fuzz = find_context(lines, next_ctx, index, eof, line_index)
             if new_index == -1:
                 ctx_txt = "\n".join(next_ctx)
                 raise DiffError(
@@ -137,17 +167,14 @@ class Parser:
                 )
             self.fuzz += fuzz
             for ch in chunks:
-                ch.orig_index += new_index
-                action.chunks.append(ch)
+                action.add_chunk(ch.orig_index + new_index, ch.del_lines, ch.ins_lines)
             index = new_index + len(next_ctx)
             self.index = end_idx
         return action
 
     def _parse_add_file(self) -> PatchAction:
         lines: List[str] = []
-        while not self.is_done(
-            ("*** End Patch", "*** Update File:", "*** Delete File:", "*** Add File:")
-        ):
+        while not self.is_done(_FILE_BOUNDARIES):
             s = self.read_line()
             if not s.startswith("+"):
                 raise DiffError(f"Invalid Add File line (missing '+'): {s}")
@@ -155,8 +182,57 @@ class Parser:
         return PatchAction(type=ActionType.ADD, new_file="\n".join(lines))
 
 
+@dataclass
+class _LineIndex:
+    """Normalised views of a file's lines, each built once and reused by lookups."""
+
+    lines: List[str]
+    _views: Dict[
+        Callable[[str], str], Tuple[List[str], Dict[str, List[int]]]
+    ] = field(default_factory=dict)
+
+    def _view(
+        self, normalize: Callable[[str], str]
+    ) -> Tuple[List[str], Dict[str, List[int]]]:
+        view = self._views.get(normalize)
+        if view is None:
+            keys = [normalize(line) for line in self.lines]
+            positions: Dict[str, List[int]] = {}
+            for i, key in enumerate(keys):
+                positions.setdefault(key, []).append(i)
+            view = self._views[normalize] = (keys, positions)
+        return view
+
+    def first(self, normalize: Callable[[str], str], key: str) -> int:
+        """Return the first index whose normalised line equals key, or -1."""
+        _keys, positions = self._view(normalize)
+        hits = positions.get(key)
+        return hits[0] if hits else -1
+
+    def find(
+        self, normalize: Callable[[str], str], context: List[str], start: int
+    ) -> int:
+        """Return the first index >= start where context occurs as a run."""
+        keys, positions = self._view(normalize)
+        candidates = positions.get(context[0])
+        if not candidates:
+            return -1
+        n = len(context)
+        last = len(keys) - n
+        for k in range(bisect_left(candidates, start), len(candidates)):
+            i = candidates[k]
+            if i > last:
+                break
+            if keys[i:i + n] == context:
+                return i
+        return -1
+
+
 def find_context_core(
-    lines: List[str], context: List[str], start: int
+    lines: List[str],
+    context: List[str],
+    start: int,
+    index: Optional[_LineIndex] = None,
 ) -> Tuple[int, int]:
     if not context:
         return start, 0
@@ -165,46 +241,43 @@ def find_context_core(
     if len(lines) < len(context):
         return -1, 0
 
-    # First try direct comparison with normalized lines
-    normalized_lines = [line.lstrip() for line in lines]
+    if index is None:
+        index = _LineIndex(lines)
 
     # Try exact match on normalized lines
-    for i in range(start, len(lines) - len(context) + 1):
-        if normalized_lines[i:i+len(context)] == context:
-            return i, 0
+    i = index.find(str.lstrip, context, start)
+    if i != -1:
+        return i, 0
 
     # Try with trailing whitespace differences
-    for i in range(start, len(lines) - len(context) + 1):
-        if [s.rstrip() for s in normalized_lines[i:i+len(context)]] == [
-            s.rstrip() for s in context
-        ]:
-            return i, 1
+    i = index.find(str.strip, [s.rstrip() for s in context], start)
+    if i != -1:
+        return i, 1
 
     # Try with all whitespace differences
-    for i in range(start, len(lines) - len(context) + 1):
-        if [s.strip() for s in normalized_lines[i:i+len(context)]] == [
-            s.strip() for s in context
-        ]:
-            return i, 100
-
-    # Original matching logic (as fallback)
-    for i in range(start, len(lines) - len(context) + 1):
-        if lines[i:i+len(context)] == context:
-            return i, 0
+    i = index.find(str.strip, [s.strip() for s in context], start)
+    if i != -1:
+        return i, 100
 
     return -1, 0
 
 
 def find_context(
-    lines: List[str], context: List[str], start: int, eof: bool
+    lines: List[str],
+    context: List[str],
+    start: int,
+    eof: bool,
+    index: Optional[_LineIndex] = None,
 ) -> Tuple[int, int]:
     if eof:
-        new_index, fuzz = find_context_core(lines, context, len(lines) - len(context))
+        new_index, fuzz = find_context_core(
+            lines, context, len(lines) - len(context), index
+        )
         if new_index != -1:
             return new_index, fuzz
-        new_index, fuzz = find_context_core(lines, context, start)
+        new_index, fuzz = find_context_core(lines, context, start, index)
         return new_index, fuzz + 10_000
-    return find_context_core(lines, context, start)
+    return find_context_core(lines, context, start, index)
 
 
 def peek_next_section(
@@ -214,42 +287,29 @@ def peek_next_section(
     del_lines: List[str] = []
     ins_lines: List[str] = []
     chunks: List[Chunk] = []
-    mode = "keep"
     orig_index = index
+    num_lines = len(lines)
 
-    while index < len(lines):
+    while index < num_lines:
         s = lines[index]
-        if s.startswith(
-            (
-                "@@",
-                "*** End Patch",
-                "*** Update File:",
-                "*** Delete File:",
-                "*** Add File:",
-                "*** End of File",
-            )
-        ):
-            break
-        if s == "***":
-            break
-        if s.startswith("***"):
-            raise DiffError(f"Invalid Line: {s}")
+        tag = s[:1]
+        # Only "@" and "*" lines can end the section; skip the checks otherwise
+        if tag in ("@", "*"):
+            if s.startswith(_CHUNK_BOUNDARIES):
+                break
+            if s == "***":
+                break
+            if s.startswith("***"):
+                raise DiffError(f"Invalid Line: {s}")
         index += 1
 
-        last_mode = mode
-        if s == "":
-            s = " "
-        if s[0] == "+":
-            mode = "add"
-        elif s[0] == "-":
-            mode = "delete"
-        elif s[0] == " ":
-            mode = "keep"
-        else:
-            raise DiffError(f"Invalid Line: {s}")
-        s = s[1:]  # Remove prefix character
-
-        if mode == "keep" and last_mode != mode:
+        if tag == "+":
+            ins_lines.append(s[1:])
+        elif tag == "-":
+            del_lines.append(s[1:])
+            old.append(s[1:])
+        elif tag == " " or not s:
+            # A context line closes the chunk opened by any preceding +/- lines
             if ins_lines or del_lines:
                 chunks.append(
                     Chunk(
@@ -258,15 +318,10 @@ def peek_next_section(
                         ins_lines=ins_lines,
                     )
                 )
-            del_lines, ins_lines = [], []
-
-        if mode == "delete":
-            del_lines.append(s)
-            old.append(s)
-        elif mode == "add":
-            ins_lines.append(s)
-        elif mode == "keep":
-            old.append(s.lstrip())  # Strip leading spaces from context lines
+                del_lines, ins_lines = [], []
+            old.append(s[1:].lstrip())  # Strip leading spaces from context lines
+        else:
+            raise DiffError(f"Invalid Line: {s}")
 
     # Add any remaining chunks
     if ins_lines or del_lines:
@@ -279,7 +334,7 @@ def peek_next_section(
         )
 
     # Check for End of File marker
-    if index < len(lines) and lines[index] == "*** End of File":
+    if index < num_lines and lines[index] == _END_OF_FILE:
         index += 1
         return old, chunks, index, True
 
@@ -289,52 +344,77 @@ def peek_next_section(
     return old, chunks, index, False
 
 
-def _get_updated_file(text: str, action: PatchAction, path: str) -> str:
+def _get_updated_file(
+    text: str,
+    action: PatchAction,
+    path: str,
+    orig_lines: Optional[List[str]] = None,
+) -> str:
     if action.type is not ActionType.UPDATE:
         raise DiffError("_get_updated_file called with non-update action")
-    orig_lines = text.split("\n")
+    chunks = action.chunks
+    if orig_lines is None:
+        num_lines = text.count("\n") + 1
+    else:
+        num_lines = len(orig_lines)
+    # Whole-file rewrite: one chunk replacing every line, nothing to splice.
+    # A file ending in "\n" splits into a trailing "" that the patch leaves
+    # in place, so the result keeps that final newline.
+    if len(chunks) == 1 and chunks[0].orig_index == 0:
+        num_deleted = len(chunks[0].del_lines)
+        if num_deleted == num_lines:
+            return "\n".join(chunks[0].ins_lines)
+        if num_deleted == num_lines - 1 and text.endswith("\n"):
+            return "\n".join([*chunks[0].ins_lines, ""])
+
+    if orig_lines is None:
+        orig_lines = text.split("\n")
     dest_lines: List[str] = []
-    orig_index = 0
+    cursor = 0
 
-    for chunk in action.chunks:
-        if chunk.orig_index > len(orig_lines):
+    # Copy untouched runs and inserted lines into one list, join once at the end
+    for chunk in chunks:
+        chunk_index = chunk.orig_index
+        if chunk_index > num_lines:
             raise DiffError(
-                f"{path}: chunk.orig_index {chunk.orig_index} exceeds file length"
+                f"{path}: chunk.orig_index {chunk_index} exceeds file length"
             )
-        if orig_index > chunk.orig_index:
+        if cursor > chunk_index:
             raise DiffError(
-                f"{path}: overlapping chunks at {orig_index} > {chunk.orig_index}"
+                f"{path}: overlapping chunks at {cursor} > {chunk_index}"
             )
 
-        dest_lines.extend(orig_lines[orig_index: chunk.orig_index])
-        orig_index = chunk.orig_index
-
+        dest_lines.extend(orig_lines[cursor:chunk_index])
         dest_lines.extend(chunk.ins_lines)
-        orig_index += len(chunk.del_lines)
+        cursor = chunk_index + len(chunk.del_lines)
 
-    dest_lines.extend(orig_lines[orig_index:])
+    dest_lines.extend(orig_lines[cursor:])
     return "\n".join(dest_lines)
 
 
+def _action_to_change(
+    path: str,
+    action: PatchAction,
+    orig: Dict[str, str],
+    orig_lines: Optional[List[str]] = None,
+) -> FileChange:
+    if action.type is ActionType.DELETE:
+        return FileChange(type=ActionType.DELETE, old_content=orig[path])
+    if action.type is ActionType.ADD:
+        if action.new_file is None:
+            raise DiffError("ADD action without file content")
+        return FileChange(type=ActionType.ADD, new_content=action.new_file)
+    new_content = _get_updated_file(orig[path], action, path, orig_lines)
+    return FileChange(
+        type=ActionType.UPDATE,
+        old_content=orig[path],
+        new_content=new_content,
+        move_path=action.move_path,
+    )
+
+
 def patch_to_commit(patch: Patch, orig: Dict[str, str]) -> Commit:
     commit = Commit()
     for path, action in patch.actions.items():
-        if action.type is ActionType.DELETE:
-            commit.changes[path] = FileChange(
-                type=ActionType.DELETE, old_content=orig[path]
-            )
-        elif action.type is ActionType.ADD:
-            if action.new_file is None:
-                raise DiffError("ADD action without file content")
-            commit.changes[path] = FileChange(
-                type=ActionType.ADD, new_content=action.new_file
-            )
-        elif action.type is ActionType.UPDATE:
-            new_content = _get_updated_file(orig[path], action, path)
-            commit.changes[path] = FileChange(
-                type=ActionType.UPDATE,
-                old_content=orig[path],
-                new_content=new_content,
-                move_path=action.move_path,
-            )
+        commit.changes[path] = _action_to_change(path, action, orig)
     return commit
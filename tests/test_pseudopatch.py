@@ -2,6 +2,7 @@ import pytest
 from pathlib import Path
 import tempfile
 import os
+import time
 from typing import Dict, List, Callable
 
 from pseudopatch.domain import ActionType, Chunk, Commit, FileChange, Patch, PatchAction
@@ -53,6 +54,22 @@ class TestParsing:
         assert patch.actions["file1.txt"].chunks[0].del_lines == ["Line 2"]
         assert patch.actions["file1.txt"].chunks[0].ins_lines == ["Line 2 modified"]
 
+    def test_text_to_patch_repeated_calls_are_independent(self):
+        patch_text = """*** Begin Patch
+*** Update File: file1.txt
+ Line 1
+-Line 2
++Line 2 modified
+*** End Patch"""
+        orig_files = {"file1.txt": "Line 1\nLine 2\nLine 3"}
+        patch1, fuzz1 = text_to_patch(patch_text, orig_files)
+        patch1.actions["file1.txt"].chunks.clear()
+
+        patch2, fuzz2 = text_to_patch(patch_text, dict(orig_files))
+        assert fuzz2 == fuzz1
+        assert len(patch2.actions["file1.txt"].chunks) == 1
+        assert patch2.actions["file1.txt"].chunks[0].ins_lines == ["Line 2 modified"]
+
     def test_text_to_patch_invalid_format(self):
         patch_text = "Not a valid patch"
         with pytest.raises(DiffError, match="Invalid patch text - missing sentinels"):
@@ -93,6 +110,34 @@ class TestPatching:
         result = _get_updated_file(text, action, "test.txt")
         assert result == "line1\nnew_line2\nline3\nnew_line4\nline5"
 
+    def test_get_updated_file_whole_file(self):
+        text = "line1\nline2\nline3"
+        action = PatchAction(type=ActionType.UPDATE)
+
+        # Replace every line of the file in one chunk
+        chunk = Chunk(
+            orig_index=0,
+            del_lines=["line1", "line2", "line3"],
+            ins_lines=["new1", "new2"],
+        )
+        action.chunks.append(chunk)
+
+        result = _get_updated_file(text, action, "test.txt")
+        assert result == "new1\nnew2"
+
+    def test_get_updated_file_whole_file_trailing_newline(self):
+        text = "line1\nline2\n"
+        action = PatchAction(type=ActionType.UPDATE)
+
+        # Replace every line; the final newline of the file is kept
+        chunk = Chunk(
+            orig_index=0, del_lines=["line1", "line2"], ins_lines=["new1"]
+        )
+        action.chunks.append(chunk)
+
+        result = _get_updated_file(text, action, "test.txt")
+        assert result == "new1\n"
+
     def test_get_updated_file_out_of_bounds(self):
         text = "line1\nline2"
         action = PatchAction(type=ActionType.UPDATE)
@@ -205,6 +250,20 @@ class TestFileOperations:
         assert files[str(self.base_path / "file1.txt")] == "content1"
         assert files[str(self.base_path / "file2.txt")] == "content2"
 
+    def test_load_files_sequential(self):
+        paths = [self.write_file(f"file{i}.txt", f"content{i}") for i in range(3)]
+        opened: List[str] = []
+
+        def open_fn(path):
+            opened.append(path)
+            return open(path, 'r').read()
+
+        files = load_files(paths, open_fn, parallel=False)
+
+        assert opened == paths
+        assert list(files) == paths
+        assert files[paths[2]] == "content2"
+
     def test_apply_commit(self):
         # Set up test files
         file1_path = self.write_file("existing.txt", "original content")
@@ -232,8 +291,10 @@ class TestFileOperations:
                 f.write(content)
 
         def remove_fn(path):
-            if os.path.exists(path):
+            try:
                 os.remove(path)
+            except FileNotFoundError:
+                pass
 
         apply_commit(commit, write_fn, remove_fn)
 
@@ -241,6 +302,87 @@ class TestFileOperations:
         assert self.read_file("existing.txt") == "updated content"
         assert self.read_file("new.txt") == "new file content"
 
+    def test_apply_commit_move_and_delete(self):
+        src_path = self.write_file("src.txt", "original content")
+        dst_path = str(self.base_path / "dst.txt")
+        gone_path = self.write_file("gone.txt", "obsolete")
+
+        commit = Commit()
+        commit.changes[src_path] = FileChange(
+            type=ActionType.UPDATE,
+            old_content="original content",
+            new_content="moved content",
+            move_path=dst_path,
+        )
+        commit.changes[gone_path] = FileChange(
+            type=ActionType.DELETE, old_content="obsolete"
+        )
+
+        def write_fn(path, content):
+            with open(path, 'w') as f:
+                f.write(content)
+
+        apply_commit(commit, write_fn, os.remove, parallel=True)
+
+        assert self.read_file("dst.txt") == "moved content"
+        assert not os.path.exists(src_path)
+        assert not os.path.exists(gone_path)
+
+    def test_apply_commit_failed_move_keeps_source(self):
+        src_path = self.write_file("src.txt", "original content")
+        dst_path = str(self.base_path / "dst.txt")
+        gone_path = self.write_file("gone.txt", "obsolete")
+
+        commit = Commit()
+        commit.changes[src_path] = FileChange(
+            type=ActionType.UPDATE,
+            old_content="original content",
+            new_content="moved content",
+            move_path=dst_path,
+        )
+        commit.changes[gone_path] = FileChange(
+            type=ActionType.DELETE, old_content="obsolete"
+        )
+
+        def write_fn(path, content):
+            time.sleep(0.01)
+            raise OSError(f"cannot write {path}")
+
+        with pytest.raises(OSError, match="cannot write"):
+            apply_commit(commit, write_fn, os.remove, parallel=True)
+
+        # No removal runs once a write has failed
+        assert self.read_file("src.txt") == "original content"
+        assert self.read_file("gone.txt") == "obsolete"
+        assert not os.path.exists(dst_path)
+
+    def test_apply_commit_delete_then_add_under_same_name(self):
+        foo_path = self.write_file("d/foo", "old file")
+        bar_path = str(self.base_path / "d" / "foo" / "bar.txt")
+
+        # "d/foo" stops being a file and becomes the directory of a new one
+        commit = Commit()
+        commit.changes[foo_path] = FileChange(
+            type=ActionType.DELETE, old_content="old file"
+        )
+        commit.changes[bar_path] = FileChange(
+            type=ActionType.ADD, new_content="nested content"
+        )
+
+        def write_fn(path, content):
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(content)
+
+        def remove_fn(path):
+            # A slow remove lets a concurrent write reach "d/foo" first
+            time.sleep(0.01)
+            os.remove(path)
+
+        apply_commit(commit, write_fn, remove_fn, parallel=True)
+
+        assert self.read_file("d/foo/bar.txt") == "nested content"
+
     def test_process_patch(self):
         # Create test files
         file1_path = self.write_file("file1.txt", "line1\nline2\nline3")
@@ -267,8 +409,10 @@ class TestFileOperations:
                 f.write(content)
 
         def remove_fn(path):
-            if os.path.exists(path):
+            try:
                 os.remove(path)
+            except FileNotFoundError:
+                pass
 
         result = process_patch(patch_text, open_fn, write_fn, remove_fn)
 
@@ -336,8 +480,10 @@ class TestEndToEnd:
                 f.write(content)
 
         def remove_fn(path):
-            if os.path.exists(path):
+            try:
                 os.remove(path)
+            except FileNotFoundError:
+                pass
 
         apply_commit(commit, write_fn, remove_fn)
 